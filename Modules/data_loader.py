@@ -1,10 +1,44 @@
+import os
+import logging
+import tempfile
+import numpy as np
 import pandas as pd
+import streamlit as st
 
-def load_data(file_path="Data/Historical_data.csv"):
-    """Load and preprocess the historical stock data."""
-    df = pd.read_csv(file_path, index_col=0)
-    df = df.transpose()
-    df.index = [f"Day -{100-i}" for i in range(len(df))]
-    print(df.head())
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _read_csv(file_path):
+    """Read the raw CSV and reshape it to one row per day, one column per stock."""
+    df = pd.read_csv(file_path, index_col=0).T
+    df.index = pd.Index(np.char.add("Day -", (100 - np.arange(len(df))).astype(str)))
     return df
 
+def _write_parquet(df, parquet_path):
+    """Write df to a temp file next to parquet_path, then move it into place atomically."""
+    stem = os.path.splitext(os.path.basename(parquet_path))[0]
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{stem}.", suffix=".parquet", dir=os.path.dirname(parquet_path) or ".")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, engine="pyarrow")
+        os.replace(tmp_path, parquet_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+@st.cache_data(show_spinner=False)
+def load_data(file_path="Data/Historical_data.csv"):
+    """Load and preprocess the historical stock data, preferring the Parquet copy."""
+    parquet_path = os.path.splitext(file_path)[0] + ".parquet"
+    # Use the Parquet copy unless the CSV exists and is newer than it
+    if os.path.exists(parquet_path) and (
+        not os.path.exists(file_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(file_path)
+    ):
+        return pd.read_parquet(parquet_path, engine="pyarrow")
+    df = _read_csv(file_path)
+    try:
+        _write_parquet(df, parquet_path)
+        logger.info(f"Wrote Parquet copy of {file_path} to {parquet_path}")
+    except (ImportError, OSError) as e:
+        logger.warning(f"Could not write Parquet copy, using the CSV data: {str(e)}")
+    return df
@@ -1,41 +1,81 @@
 import numpy as np
 from statsmodels.tsa.arima.model import ARIMA
-from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
-import matplotlib.pyplot as plt
-from io import BytesIO
+import matplotlib
+matplotlib.use("Agg")  # headless; must run before anything imports pyplot
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import logging
-from statsmodels.tsa.stattools import adfuller, acf, pacf
+import threading
+import streamlit as st
+from statsmodels.tsa.stattools import acf, pacf
+from Modules.stationarity import adf_fixed_lag
+import pandas as pd
+
+try:
+    from statsforecast.models import ARIMA as SFARIMA
+except ImportError:  # statsforecast is optional; fall back to statsmodels
+    SFARIMA = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_arima_params(series):
-    """Determine ARIMA parameters (p, d, q) and generate ACF/PACF plots."""
-    series_clean = series.dropna()
-    if len(series_clean) < 2 or series_clean.std() == 0:
+def _new_figure(nrows, figsize=(8, 5), dpi=80):
+    """Create a figure with an Agg canvas attached, for reuse across plot calls."""
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots(nrows, 1)
+
+# Figures are created once and cleared between calls; the lock keeps
+# concurrent Streamlit sessions from drawing into the same figure.
+_FIG_LOCK = threading.Lock()
+_ACF_FIG, (_ACF_AX, _PACF_AX) = _new_figure(2)
+_PRICE_FIG, _PRICE_AX = _new_figure(1)
+_PCT_FIG, _PCT_AX = _new_figure(1)
+_FORECAST_FIG, _FORECAST_AX = _new_figure(1)
+
+def _render_figure(fig):
+    """Render a figure to an RGBA array with Agg, skipping PNG encoding."""
+    fig.canvas.draw()
+    w, h = fig.canvas.get_width_height()
+    return np.frombuffer(fig.canvas.buffer_rgba(), np.uint8).reshape(h, w, 4).copy()
+
+# Bounded caches: each ACF/PACF entry holds a ~1 MB image and each fitted model
+# is kept per (series, p, d, q), so unbounded caches would grow on a shared server
+@st.cache_data(show_spinner=False, max_entries=32, ttl="1h")
+def get_arima_params(series_clean):
+    """Determine ARIMA parameters (p, d, q) and generate ACF/PACF plots for a NaN-free series."""
+    # Differencing twice must still leave enough points for the ADF regression
+    if len(series_clean) < 10 or series_clean.std() == 0:
         logger.warning("Cannot determine ARIMA parameters: Constant or insufficient data")
         return 1, 0, 1, None  # Default values and no plot
     
     diff_count = 0
-    temp_series = series_clean.copy()
-    while adfuller(temp_series)[1] > 0.05 and diff_count < 2:
-        temp_series = temp_series.diff().dropna()
+    # Difference the raw array rather than building a new Series each step
+    temp_series = series_clean.to_numpy(dtype=np.float64)
+    while adf_fixed_lag(temp_series)[1] > 0.05 and diff_count < 2:
+        temp_series = np.diff(temp_series)
         diff_count += 1
     
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
-    plot_acf(temp_series, lags=20, ax=ax1)
-    plot_pacf(temp_series, lags=20, ax=ax2)
-    ax1.set_title("ACF")
-    ax2.set_title("PACF")
-    plt.tight_layout()
-    
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
+    # Compute ACF/PACF once and use the same values for the plots and the estimates
+    nlags = min(20, len(temp_series) // 2 - 1)
+    acf_values = acf(temp_series, nlags=nlags, fft=True)
+    # "ywm" matches plot_pacf's default; the p estimate used to come from pacf's
+    # default "ywadjusted", so suggested p can differ from earlier versions
+    pacf_values = pacf(temp_series, nlags=nlags, method="ywm")
+    lags = np.arange(len(acf_values))
+    conf = 1.96 / np.sqrt(len(temp_series))
+    with _FIG_LOCK:
+        for ax, values, title in ((_ACF_AX, acf_values, "ACF"), (_PACF_AX, pacf_values, "PACF")):
+            ax.clear()
+            ax.stem(lags, values, basefmt="k-")
+            ax.fill_between(lags, -conf, conf, alpha=0.25)
+            ax.set_title(title)
+        _ACF_FIG.tight_layout()
+        img = _render_figure(_ACF_FIG)
     
-    # Use pacf and acf for parameter estimation
-    pacf_values = pacf(temp_series, nlags=20)[1:]  # Exclude lag 0
-    acf_values = acf(temp_series, nlags=20)[1:]    # Exclude lag 0
+    # Use pacf and acf for parameter estimation, excluding lag 0
+    pacf_values = pacf_values[1:]
+    acf_values = acf_values[1:]
     p = next((i for i in range(len(pacf_values)) if abs(pacf_values[i]) > 0.2), 1)
     q = next((i for i in range(len(acf_values)) if abs(acf_values[i]) > 0.2), 1)
     
@@ -44,69 +84,85 @@ def get_arima_params(series):
     q = min(q, 10)
     
     logger.info(f"ARIMA parameters determined: p={p}, d={diff_count}, q={q}")
-    return p, diff_count, q, buf
+    return p, diff_count, q, img
 
 def plot_prices(data, stocks, title):
     """Plot stock prices."""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    for stock in stocks:
-        ax.plot(data.index, data[stock], label=stock)
-    ax.set_title(title)
-    ax.set_xlabel("Day")
-    ax.set_ylabel("Price (INR)")
-    ax.legend()
-    ax.grid(True)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
-    return buf
+    with _FIG_LOCK:
+        ax = _PRICE_AX
+        ax.clear()
+        lines = ax.plot(data.index, data[stocks].to_numpy(), rasterized=True)
+        ax.set_title(title)
+        ax.set_xlabel("Day")
+        ax.set_ylabel("Price (INR)")
+        ax.legend(lines, stocks)
+        ax.grid(True)
+        ax.tick_params(axis="x", labelrotation=45)
+        _PRICE_FIG.tight_layout()
+        return _render_figure(_PRICE_FIG)
 
 def plot_pct_change(data, stocks, title):
     """Plot percentage change of stock prices."""
-    pct_change = data[stocks].pct_change().dropna() * 100
-    fig, ax = plt.subplots(figsize=(10, 6))
-    for stock in stocks:
-        ax.plot(pct_change.index, pct_change[stock], label=stock)
-    ax.set_title(title)
-    ax.set_xlabel("Day")
-    ax.set_ylabel("Percentage Change (%)")
-    ax.legend()
-    ax.grid(True)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
-    return buf
+    # Forward-fill gaps so each day has a change, matching pct_change()'s pad semantics
+    prices = data[stocks].ffill().to_numpy(dtype=np.float64)
+    pct_change = (prices[1:] / prices[:-1] - 1.0) * 100.0
+    with _FIG_LOCK:
+        ax = _PCT_AX
+        ax.clear()
+        lines = ax.plot(data.index[1:], pct_change, rasterized=True)
+        ax.set_title(title)
+        ax.set_xlabel("Day")
+        ax.set_ylabel("Percentage Change (%)")
+        ax.legend(lines, stocks)
+        ax.grid(True)
+        ax.tick_params(axis="x", labelrotation=45)
+        _PCT_FIG.tight_layout()
+        return _render_figure(_PCT_FIG)
 
 def plot_forecast(series, forecast, stock_name):
     """Plot historical data and forecast."""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.plot(series.index[-30:], series[-30:], label="Historical", color="blue")
     forecast_index = [f"Day +{i+1}" for i in range(len(forecast))]
-    ax.plot(forecast_index, forecast, label="Forecast", color="red", linestyle="--")
-    ax.set_title(f"7-Day Forecast for {stock_name}")
-    ax.set_xlabel("Day")
-    ax.set_ylabel("Price (INR)")
-    ax.legend()
-    ax.grid(True)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    buf = BytesIO()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
-    return buf
+    with _FIG_LOCK:
+        ax = _FORECAST_AX
+        ax.clear()
+        ax.plot(series.index[-30:], series[-30:], label="Historical", color="blue", rasterized=True)
+        ax.plot(forecast_index, forecast, label="Forecast", color="red", linestyle="--", rasterized=True)
+        ax.set_title(f"7-Day Forecast for {stock_name}")
+        ax.set_xlabel("Day")
+        ax.set_ylabel("Price (INR)")
+        ax.legend()
+        ax.grid(True)
+        ax.tick_params(axis="x", labelrotation=45)
+        _FORECAST_FIG.tight_layout()
+        return _render_figure(_FORECAST_FIG)
+
+@st.cache_resource(show_spinner=False, max_entries=64, ttl="1h")
+def _fit_arima(values, p, d, q):
+    """Fit an ARIMA model, reusing the fitted model for repeated inputs."""
+    if SFARIMA is not None:
+        try:
+            return SFARIMA(order=(p, d, q)).fit(values)
+        except Exception as e:
+            logger.warning(f"statsforecast ARIMA fit failed, falling back to statsmodels: {str(e)}")
+    # Only point forecasts are used, so skip the covariance estimate and stop the
+    # optimiser early; the stationarity/invertibility constraints stay on because
+    # without them a truncated fit can return explosive AR coefficients
+    return ARIMA(values, order=(p, d, q)).fit(
+        method="statespace", method_kwargs={"maxiter": 25, "disp": False}, cov_type="none", low_memory=True
+    )
 
-def forecast_stock(series, p, d, q):
-    """Generate ARIMA forecast."""
-    series_clean = series.dropna()
+def forecast_stock(series_clean, p, d, q):
+    """Generate ARIMA forecast for a NaN-free series."""
     if len(series_clean) < 2 or series_clean.std() == 0:
         raise Exception("Cannot forecast: Constant or insufficient data")
     try:
-        model = ARIMA(series_clean, order=(p, d, q)).fit()
-        forecast = model.forecast(steps=7)
+        forecast_index = [f"Day +{i+1}" for i in range(7)]
+        model = _fit_arima(series_clean.values.astype(np.float64), p, d, q)
+        # Branch on the model actually returned, which may be the statsmodels fallback
+        if SFARIMA is not None and isinstance(model, SFARIMA):
+            forecast = pd.Series(model.predict(h=7)["mean"], index=forecast_index)
+        else:
+            forecast = pd.Series(model.forecast(steps=7), index=forecast_index)
         logger.info(f"Forecast generated for {len(forecast)} days")
         return forecast
     except Exception as e:
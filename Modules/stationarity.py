@@ -4,6 +4,14 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# A fixed small lag (one OLS fit) instead of an AIC lag search is enough for ~100 points
+ADF_MAXLAG = 5
+
+def adf_fixed_lag(values):
+    """Run adfuller with a fixed lag, clamped to the largest lag valid for len(values)."""
+    maxlag = max(0, min(ADF_MAXLAG, len(values) // 2 - 3))
+    return adfuller(values, maxlag=maxlag, regression="c", autolag=None)
+
 def adf_test(series, stock_name):
     """Perform ADF test for stationarity, handling constant series."""
     series_clean = series.dropna()
@@ -17,7 +25,7 @@ def adf_test(series, stock_name):
             "Stationary": "Cannot Test (Constant or Insufficient Data)"
         }
     try:
-        result = adfuller(series_clean)
+        result = adf_fixed_lag(series_clean.values)
         logger.info(f"ADF test completed for {stock_name} with p-value {result[1]}")
         return {
             "Stock": stock_name,
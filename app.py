@@ -72,18 +72,19 @@ selected_stocks = st.sidebar.multiselect("Select up to 4 stocks", options=data.c
 # Main content with collapsible sections
 if selected_stocks:
     with st.expander("Stock Comparison", expanded=True):
+        window = data[selected_stocks].iloc[-time_interval:]
         st.markdown('<div class="stSubheader">Stock Price Trends</div>', unsafe_allow_html=True)
-        price_plot = plot_prices(data[selected_stocks].iloc[-time_interval:], selected_stocks, "Stock Price Comparison")
-        st.image(price_plot, caption="Stock Price Trends", use_column_width=True)
+        price_plot = plot_prices(window, selected_stocks, "Stock Price Comparison")
+        st.image(price_plot, caption="Stock Price Trends", width="stretch", output_format="PNG")
         
         st.markdown('<div class="stSubheader">Percentage Change Trends</div>', unsafe_allow_html=True)
-        pct_plot = plot_pct_change(data[selected_stocks].iloc[-time_interval:], selected_stocks, "Percentage Change Comparison")
-        st.image(pct_plot, caption="Percentage Change Trends", use_column_width=True)
+        pct_plot = plot_pct_change(window, selected_stocks, "Percentage Change Comparison")
+        st.image(pct_plot, caption="Percentage Change Trends", width="stretch", output_format="PNG")
         
         st.markdown('<div class="stSubheader">Summary Statistics</div>', unsafe_allow_html=True)
-        stats = data[selected_stocks].iloc[-time_interval:].describe().transpose()[["mean", "std"]]
+        stats = window.describe().transpose()[["mean", "std"]]
         stats["volatility"] = stats["std"] / stats["mean"] * 100
-        st.dataframe(stats.style.format("{:.2f}"))
+        st.dataframe(stats.round(2))
         
         if len(selected_stocks) > 1:
             most_volatile = stats["volatility"].idxmax()
@@ -99,7 +100,7 @@ if selected_stocks:
             elif val == "Non-Stationary":
                 return 'background-color: #ffe6e6'
             return ''
-        st.dataframe(adf_df.style.applymap(color_stationary, subset=['Stationary']).format({
+        st.dataframe(adf_df.style.map(color_stationary, subset=['Stationary']).format({
             "ADF Statistic": "{:.2f}", "p-value": "{:.4f}"
         }))
 
@@ -107,14 +108,14 @@ if selected_stocks:
         stock_to_forecast = st.selectbox("Select stock for forecasting", options=selected_stocks, help="Choose a stock to predict future prices.")
         
         if stock_to_forecast:
-            series = data[stock_to_forecast].dropna()
-            p, d, q, acf_pacf_plot = get_arima_params(series)
+            series_clean = data[stock_to_forecast].dropna()
+            p, d, q, acf_pacf_plot = get_arima_params(series_clean)
             
             if acf_pacf_plot is None:
                 st.warning(f"Cannot generate ARIMA parameters for {stock_to_forecast}: Constant or insufficient data")
             else:
                 st.markdown('<div class="stSubheader">ACF and PACF Plots</div>', unsafe_allow_html=True)
-                st.image(acf_pacf_plot, caption="ACF and PACF for ARIMA Parameter Selection", use_column_width=True)
+                st.image(acf_pacf_plot, caption="ACF and PACF for ARIMA Parameter Selection", width="stretch", output_format="PNG")
             
             st.markdown('<div class="stSubheader">Customize ARIMA Parameters</div>', unsafe_allow_html=True)
             col1, col2, col3 = st.columns(3)
@@ -127,15 +128,15 @@ if selected_stocks:
             
             if st.button("Forecast (7 days)"):
                 try:
-                    forecast = forecast_stock(series, p_user, d_user, q_user)
+                    forecast = forecast_stock(series_clean, p_user, d_user, q_user)
                     forecast_index = [f"Day +{i+1}" for i in range(7)]
                     forecast_df = pd.DataFrame({"Forecast": forecast}, index=forecast_index)
                     
-                    forecast_plot = plot_forecast(series, forecast, stock_to_forecast)
-                    st.image(forecast_plot, caption=f"7-Day Forecast for {stock_to_forecast}", use_column_width=True)
+                    forecast_plot = plot_forecast(series_clean, forecast, stock_to_forecast)
+                    st.image(forecast_plot, caption=f"7-Day Forecast for {stock_to_forecast}", width="stretch", output_format="PNG")
                     
                     st.markdown('<div class="stSubheader">Forecast Results</div>', unsafe_allow_html=True)
-                    st.dataframe(forecast_df.style.format("{:.2f}"))
+                    st.dataframe(forecast_df.round(2))
                 except Exception as e:
                     st.error(f"Error in ARIMA model: {str(e)}")
 else: